@@ -2,40 +2,60 @@
 """! @brief Python program for parsing the output of the Blacksmith Rowhammer
             fuzzer to use with gluezilla-templater."""
 
-import json
 import argparse
-import pandas as pd
+import functools
+import numpy as np
 
+try:
+    # orjson parses large Blacksmith summaries considerably faster
+    from orjson import dumps as json_dumps
+    from orjson import loads as json_loads
+except ImportError:
+    from json import dumps
+    from json import loads as json_loads
 
-def get_best_pattern(data):
+    def json_dumps(obj):
+        """! Serializes obj to compact JSON bytes like orjson.dumps."""
+
+        return dumps(obj, separators=(",", ":")).encode()
+
+
+def count_bitflips(patterns):
+    """! Counts the bit flips of the first three address mappings of every
+         pattern.
+
+    @param patterns The hammering patterns from json file.
+
+    @return Array of shape (patterns, 3, 3) with the number of bit flips per
+            pattern, address mapping and bit flips entry.
+    """
+
+    bitflips = np.zeros((len(patterns), 3, 3), dtype=np.int32)
+    for i, pattern in enumerate(patterns):
+        # patterns may lack address mappings or bit flips entries
+        mappings = pattern.get("address_mappings") or ()
+        for j, mapping in enumerate(mappings[:3]):
+            bit_flips = mapping.get("bit_flips") or ()
+            for k, flips in enumerate(bit_flips[:3]):
+                bitflips[i, j, k] = len(flips)
+
+    return bitflips
+
+
+def get_best_pattern(bitflips):
     """! Determines the best pattern by bit flip count.
 
-    @param data The data from json file.
+    @param bitflips The bit flip counts from count_bitflips.
 
     @return The id and mapping id of the pattern with most bit flips.
     """
 
-    total_bitflips_old = 0
-    id = 0
-    mapping = 0
-    df = pd.DataFrame(data["hammering_patterns"])
-    # determine best mapping
-    for i in range(0, len(df["address_mappings"])):
-        for j in range(3):
-            total_bitflips = 0
-            for k in range(3):
-                try:
-                    total_bitflips += len(data["hammering_patterns"]
-                                          [i]["address_mappings"]
-                                          [j]["bit_flips"][k])
-                except:  # cos the data structure is sometimes strange
-                    pass
-            if total_bitflips_old < total_bitflips:
-                total_bitflips_old = total_bitflips
-                id = i
-                mapping = j
-
-    return id, mapping
+    mapping_bitflips = bitflips.sum(axis=2)
+    # argmax returns the first pattern and mapping with most bit flips
+    id, mapping = np.unravel_index(mapping_bitflips.argmax(),
+                                   mapping_bitflips.shape)
+
+    return int(id), int(mapping)
 
 
 def create_hammer_order(access_ids_list):
@@ -46,13 +66,41 @@ def create_hammer_order(access_ids_list):
     @return The configuration string.
     """
 
-    vector = "hammer_order="
-    for id in access_ids_list:
-        vector += f"{id},"
+    return "hammer_order=" + ",".join(map(str, access_ids_list))
+
+
+def code_jitter_to_settings(code_jitter):
+    """! Extracts the configuration settings from the code_jitter entry.
+
+    @param code_jitter The code_jitter of the blacksmith pattern.
+
+    @return The configuration settings as key value pairs.
+    """
+
+    return code_jitter_settings(code_jitter['num_aggs_for_sync'],
+                                code_jitter['total_activations'],
+                                code_jitter['fencing_strategy'],
+                                code_jitter['flushing_strategy'])
+
 
-    vector = vector[:-1]
+@functools.lru_cache(maxsize=None)
+def code_jitter_settings(num_aggs_for_sync, total_activations,
+                         fencing_strategy, flushing_strategy):
+    """! Constructs the configuration settings from the code_jitter settings.
+         Cached, as many patterns share the same settings.
 
-    return vector
+    @param num_aggs_for_sync The number of aggressors for synchronization.
+    @param total_activations The total number of activations.
+    @param fencing_strategy The fencing strategy.
+    @param flushing_strategy The flushing strategy.
+
+    @return The configuration settings as key value pairs.
+    """
+
+    return (("num_aggs_for_sync", num_aggs_for_sync),
+            ("total_num_activations", total_activations),
+            ("fencing", str(fencing_strategy).lower()),
+            ("flushing", str(flushing_strategy).lower()))
 
 
 def code_jitter_to_config(code_jitter):
@@ -64,32 +112,25 @@ def code_jitter_to_config(code_jitter):
     @return The configuration string.
     """
 
-    variables = ""
-    variables += f"num_aggs_for_sync={code_jitter['num_aggs_for_sync']}\n"
-    variables += f"total_num_activations={code_jitter['total_activations']}\n"
-    variables += f"fencing={str(code_jitter['fencing_strategy']).lower()}\n"
-    variables += f"flushing={str(code_jitter['flushing_strategy']).lower()}\n"
-
-    return variables
+    return "".join(f"{key}={value}\n"
+                   for key, value in code_jitter_to_settings(code_jitter))
 
 
-def output_best_pattern(data, filename):
+def output_best_pattern(patterns, bitflips, filename):
     """! Outputs the best pattern to file.
 
-    @param data The data from json file.
+    @param patterns The hammering patterns from json file.
+    @param bitflips The bit flip counts from count_bitflips.
     @param filename The filename of the Blacksmith json file used for
            generating the best pattern file.
     """
 
-    df = pd.DataFrame(data["hammering_patterns"])
     # get id of best pattern
-    id, mapping = get_best_pattern(data)
-    # get access ids as list from dataframe
-    access_ids = list(df.iloc[id, 0])
-    vec = create_hammer_order(access_ids)
-    # get best pattern from dataframe
-    df_best_pattern = df.iloc[id, 1]
-    var = code_jitter_to_config(df_best_pattern[mapping]["code_jitter"])
+    id, mapping = get_best_pattern(bitflips)
+    best_pattern = patterns[id]
+    vec = create_hammer_order(best_pattern["access_ids"])
+    mappings = best_pattern["address_mappings"]
+    var = code_jitter_to_config(mappings[mapping]["code_jitter"])
     # create config string
     config_string = f"{vec}\n{var}"
     # write config to file
@@ -97,64 +138,53 @@ def output_best_pattern(data, filename):
         config_file.write(config_string)
 
 
-def output_all_patterns(data, filename, min_bitflips, max_aggs):
+def output_all_patterns(patterns, bitflips, filename, min_bitflips, max_aggs):
     """! Outputs all patterns with bitflips > min_bitflips
-         and aggressors < max_aggs
+         and aggressors < max_aggs as one JSON object per line
 
-    @param  data The data from json file.
+    @param  patterns The hammering patterns from json file.
+    @param  bitflips The bit flip counts from count_bitflips.
     """
 
-    df = pd.DataFrame(data["hammering_patterns"])
-    # clear output file if exists
-    open(filename + "_all_patterns.txt", "w").close()
-    # count bit flips achieved by pattern
-    for i in range(len(df)):
-        total_bitflips = 0
-        for j in range(3):
-            for k in range(3):
-                try:
-                    total_bitflips += len(data["hammering_patterns"]
-                                          [i]["address_mappings"]
-                                          [j]["bit_flips"][k])
-                except:  # cos the data structure is sometimes strange
-                    pass
-        # get access ids as list from dataframe
-        access_ids = list(df.iloc[i, 0])
-        # if too many agg.s -> continue
-        if max(access_ids) > max_aggs:
-            continue
-        vec = create_hammer_order(access_ids)
-        # get pattern from dataframe
-        df_pattern = df.iloc[i, 1]
-        var = code_jitter_to_config(df_pattern[0]["code_jitter"])
-        # create config string
-        config_string = f"ID: {i}\nBitflips: {total_bitflips}\n{vec}\n{var}\n"
-        # write config to file
-        if total_bitflips >= min_bitflips:
-            with open(filename + "_all_patterns.txt", "a") as config_file:
-                config_file.write(config_string)
-
+    total_bitflips = bitflips.sum(axis=(1, 2))
+    max_agg_ids = np.array([max(pattern["access_ids"]) for pattern in patterns])
+    # select patterns with enough bit flips and not too many agg.s
+    accepted = np.flatnonzero((total_bitflips >= min_bitflips)
+                              & (max_agg_ids <= max_aggs))
+    records = []
+    for i in accepted.tolist():
+        pattern = patterns[i]
+        code_jitter = pattern["address_mappings"][0]["code_jitter"]
+        record = {"id": i, "bitflips": int(total_bitflips[i]),
+                  "hammer_order": pattern["access_ids"]}
+        record.update(code_jitter_to_settings(code_jitter))
+        records.append(json_dumps(record) + b"\n")
+    # write configs to file
+    with open(filename + "_all_patterns.jsonl", "wb") as config_file:
+        config_file.write(b"".join(records))
 
 def main():
     """! Main program entry."""
 
     # parse arguments
     parser = argparse.ArgumentParser()
-    parser.add_argument('filename')
+    parser.add_argument('file', type=argparse.FileType('rb'))
     parser.add_argument(
         '--min_bitflips', dest='min_bitflips', default=100, type=int)
     parser.add_argument('--max_aggs', dest='max_aggs', default=20, type=int)
     args = parser.parse_args()
-    filename = args.filename
+    filename = args.file.name
     min_bitflips = args.min_bitflips
     max_aggs = args.max_aggs
     # read the json file
-    with open(filename, 'r') as file:
-        data = json.load(file)
+    with args.file as file:
+        patterns = json_loads(file.read())["hammering_patterns"]
+    # count bit flips once for both outputs
+    bitflips = count_bitflips(patterns)
     # output the pattern with the most bit flips to file
-    output_best_pattern(data, filename)
+    output_best_pattern(patterns, bitflips, filename)
     # output all patterns with bitflips > min_bitflips to file
-    output_all_patterns(data, filename, min_bitflips, max_aggs)
+    output_all_patterns(patterns, bitflips, filename, min_bitflips, max_aggs)
 
 
 if __name__ == "__main__":
@@ -163,19 +193,19 @@ if __name__ == "__main__":
 
 # json format
 
-""" hammering_patterns
-    Index 0 = access_ids
-    Index 1 = address_mappings
-    Index 2 = agg_access_patterns
-    Index 3 = base_period
-    Index 4 = id
-    Index 5 = is_location_dependent
-    Index 6 = max_period
-    Index 7 = num_refresh_intervals
-    Index 8 = total_activations
+""" hammering_patterns -> list of dict
+    "access_ids"
+    "address_mappings"
+    "agg_access_patterns"
+    "base_period"
+    "id"
+    "is_location_dependent"
+    "max_period"
+    "num_refresh_intervals"
+    "total_activations"
 """
 
-""" address_mappings
+""" address_mappings -> list of aggressor_to_addr
     Index 0 = aggressor_to_addr1
     Index 1 = aggressor_to_addr2
     Index 2 = aggressor_to_addr3
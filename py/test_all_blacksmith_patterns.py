@@ -1,44 +1,45 @@
 #!/usr/bin/python3
 """! @brief Python program for testing all Blacksmith Patterns from a file."""
 
-import re
-import configparser
 import signal
 import subprocess
 import sys
 import os
 import time
+import tempfile
 import argparse
 
-# regex for parsing the patterns
-id_regex = "ID: (\d*)"
-bitflips_regex = "Bitflips: (\d*)"
-hammer_order_regex = "hammer_order=([\d,\d]*)"
-num_aggs_for_sync_regex = "num_aggs_for_sync=(\d*)"
-total_num_activations_regex = "total_num_activations=(\d*)"
-fencing_regex = "fencing=(.*)"
-flushing_regex = "flushing=(.*)"
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
+# configuration applied on top of config.ini for every pattern
+pattern_config_template = """[blacksmith]
+hammer_order={hammer_order}
+num_aggs_for_sync={num_aggs_for_sync}
+total_num_activations={total_num_activations}
+fencing={fencing}
+flushing={flushing}
 
-def run_gluezilla_templater():
+[db.experiments]
+comment=ID:{id}
+"""
+
+
+def run_gluezilla_templater(config_files):
     """! Executes gluezilla-templater.
 
+    @param config_files The base configuration file followed by the
+           configuration files to test.
     """
 
     global process_pid
-    process = subprocess.Popen(['./bin/tester'], stdout=subprocess.PIPE,
-                            universal_newlines=True, shell=True)
+    # output of gluezilla-templater goes directly to our stdout
+    process = subprocess.Popen(['./bin/tester'] + config_files)
     process_pid = process.pid
-    while True:
-        output = process.stdout.readline()
-        print(output.strip())     
-        return_code = process.poll()
-        if return_code is not None:
-            print('RETURN CODE', return_code)
-            # process has finished, read rest of the output 
-            for output in process.stdout.readlines():
-                print(output.strip())
-            break
+    return_code = process.wait()
+    print('RETURN CODE', return_code)
 
 
 def signal_handler(sig, frame):
@@ -57,49 +58,34 @@ def test_patterns(filename):
     """! Test the patterns from specified file.
 
     @params filename The filename of the file containing the Blacksmiths
-            patterns.
+            patterns, one JSON object per line.
     """
 
-    config = configparser.ConfigParser()
-    with open(filename, 'r') as bsp_file:
-        line = bsp_file.readline()
-        while line:       
-            x = re.search(id_regex, line)
-            if x:
-                # get pattern from file
-                id = x.group(1)
-                line = bsp_file.readline()
-                x = re.search(bitflips_regex, line)
-                bitflips = x.group(1)
-                line = bsp_file.readline()
-                x = re.search(hammer_order_regex, line)
-                hammer_order = x.group(1)
-                line = bsp_file.readline()
-                x = re.search(num_aggs_for_sync_regex, line)
-                num_aggs_for_sync = x.group(1)
-                line = bsp_file.readline()
-                x = re.search(total_num_activations_regex, line)
-                total_num_activations = x.group(1)
-                line = bsp_file.readline()
-                x = re.search(fencing_regex, line)
-                fencing = x.group(1)
-                line = bsp_file.readline()
-                x = re.search(flushing_regex, line)
-                flushing = x.group(1) 
-            # adjust configuration
-            config.read('./config.ini')
-            config.set("blacksmith", "hammer_order", str(hammer_order))
-            config.set("blacksmith", "num_aggs_for_sync", str(num_aggs_for_sync))
-            config.set("blacksmith", "total_num_activations", str(total_num_activations))
-            config.set("blacksmith", "fencing", fencing)
-            config.set("blacksmith", "flushing", flushing)
-            config.set("db.experiments", "comment", "ID:" + str(id))
-            # write config.ini
-            with open('./config.ini', 'w') as configfile:
-                config.write(configfile, space_around_delimiters=False)
-            # execute gluezilla-templater
-            run_gluezilla_templater()
-            line = bsp_file.readline()
+    # parse all patterns before the first run to fail early on bad input
+    with open(filename, 'rb') as bsp_file:
+        patterns = [json_loads(line) for line in bsp_file.read().splitlines()
+                    if line.strip()]
+    if not patterns:
+        print('No patterns found in', filename)
+        return
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_files = ['./config.ini']
+        for pattern in patterns:
+            # write config with the settings of the pattern
+            config_file = os.path.join(config_dir,
+                                       f"pattern_{pattern['id']}.ini")
+            with open(config_file, 'w') as configfile:
+                configfile.write(pattern_config_template.format(
+                    hammer_order=",".join(map(str, pattern["hammer_order"])),
+                    num_aggs_for_sync=pattern["num_aggs_for_sync"],
+                    total_num_activations=pattern["total_num_activations"],
+                    fencing=pattern["fencing"],
+                    flushing=pattern["flushing"],
+                    id=pattern["id"]))
+            config_files.append(config_file)
+        # execute gluezilla-templater once, testing the patterns one after
+        # another on top of config.ini
+        run_gluezilla_templater(config_files)
 
 
 def main():
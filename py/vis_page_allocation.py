@@ -1,67 +1,53 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import glob
-import seaborn as sns
-
-import multiprocessing
-from joblib import Parallel, delayed
-from tqdm import tqdm
-import pickle
-import os
+from concurrent.futures import ProcessPoolExecutor
 
 scatter = True
 heatmap = True
 
-def count_range_in_list(li, min, max):
-    ctr = 0
-    for x in li:
-        if min <= x <= max:
-            ctr += 1
-    return ctr
+r = 10000
+
+def compute(fn):
+    with open(fn, 'rb') as f:
+        bits = np.frombuffer(f.read(), dtype=np.uint8)
 
-files = glob.glob('mem*.txt', recursive=True)
-fig, ax = plt.subplots(2, max(len(files), 2))
+    addresses = np.flatnonzero(bits == ord('0'))
 
-for n, fn in enumerate(files):
-    bits = [ch == '1' for ch in open(fn).read()]
+    # count addresses per range of r bits starting at the first address
+    y = np.bincount((addresses - addresses[0]) // r)
+    image = y.reshape(1, len(y))
 
-    print(fn)
+    return fn, addresses, image
 
-    addresses = [i for i, b in enumerate(bits) if not b]
+if __name__ == "__main__":
+    files = glob.glob('mem*.txt', recursive=True)
+    fig, ax = plt.subplots(2, max(len(files), 2))
 
-    ### scatterplot (+ jitter)
+    # read files in parallel, plot on the main process only
+    with ProcessPoolExecutor() as ex:
+        results = list(ex.map(compute, files))
 
-    if scatter:
-        print("  scatter")
+    for n, (fn, addresses, image) in enumerate(results):
+        print(fn)
 
-        ax[0, n].scatter(addresses, np.random.randn(len(addresses)), marker='.')
-        ax[0, n].title.set_text(fn)
-        ax[0, n].set_yticks([])
+        ### scatterplot (+ jitter)
 
-    # heatmap
+        if scatter:
+            print("  scatter")
 
-    if heatmap:
-        print("  heatmap")
-        
-        r = 10000
-        pn = f"hm_{fn}"
-        if not os.path.exists(pn):
-            print("    downsampling")
+            ax[0, n].scatter(addresses, np.random.randn(len(addresses)), marker='.')
+            ax[0, n].title.set_text(fn)
+            ax[0, n].set_yticks([])
 
-            num_cores = multiprocessing.cpu_count()
-            y = Parallel(n_jobs=num_cores)(delayed(count_range_in_list)(addresses, x, x + r)
-                                            for x in tqdm(range(addresses[0], addresses[-1] + 1, r)))
+        # heatmap
 
-            with open(pn, "wb") as pf:
-                pickle.dump(y, pf)
-        else:
-            with open(pn, "rb") as pf:
-                y = pickle.load(pf)
+        if heatmap:
+            print("  heatmap")
 
-        image = np.array(y)
-        image = image.reshape(1, len(image))
-        sns.heatmap(image, vmin=0, vmax=r, cmap="rocket_r",
-                    cbar=False, linewidths=0.0, ax=ax[1, n], yticklabels=False)
+            ax[1, n].imshow(image, aspect='auto', interpolation='nearest',
+                            cmap="magma_r", vmin=0, vmax=r)
+            ax[1, n].set_yticks([])
 
-plt.tight_layout()
-plt.show()
+    plt.tight_layout()
+    plt.show()